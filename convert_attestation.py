@@ -1,5 +1,15 @@
 import json
 
+# Lookup table mapping each byte value to its Move "Nu8" literal
+BYTE_LITERALS = [f"{i}u8" for i in range(256)]
+
+# Number of input bytes formatted per write
+CHUNK_SIZE = 4096
+
+def format_bytes(chunk):
+    """Format a run of bytes as comma-separated Move "Nu8" literals"""
+    return ", ".join([BYTE_LITERALS[b] for b in chunk])
+
 # Read the attestation.json file
 with open('attestation.json', 'r') as f:
     data = json.load(f)
@@ -7,21 +17,20 @@ with open('attestation.json', 'r') as f:
 # Extract the attestation hex string
 attestation_hex = data['attestation']
 
-# Convert hex to byte array format
-bytes_array = []
-for i in range(0, len(attestation_hex), 2):
-    byte_value = int(attestation_hex[i:i+2], 16)
-    bytes_array.append(f"{byte_value}u8")
-
-# Create vector string
-vector_str = "[" + ", ".join(bytes_array) + "]"
+# Convert hex to raw bytes
+raw = bytes.fromhex(attestation_hex)
 
-# Write to file
-with open('attestation_vector.txt', 'w') as f:
-    f.write(vector_str)
+# Write the vector string to file chunk by chunk
+with open('attestation_vector.txt', 'w', buffering=1 << 20) as f:
+    f.write("[")
+    for start in range(0, len(raw), CHUNK_SIZE):
+        if start:
+            f.write(", ")
+        f.write(format_bytes(raw[start:start + CHUNK_SIZE]))
+    f.write("]")
 
 # Print summary
-print(f"Successfully converted {len(bytes_array)} bytes")
-print(f"First 10 bytes: {', '.join(bytes_array[:10])}...")
-print(f"Last 10 bytes: ...{', '.join(bytes_array[-10:])}")
+print(f"Successfully converted {len(raw)} bytes")
+print(f"First 10 bytes: {format_bytes(raw[:10])}...")
+print(f"Last 10 bytes: ...{format_bytes(raw[-10:])}")
 print(f"Output saved to attestation_vector.txt") 
\ No newline at end of file
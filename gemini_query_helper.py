@@ -1,13 +1,91 @@
 #!/usr/bin/env python3
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-import base64
 import sys
 import hashlib
 import os
 
+# pybase64 is a drop-in SIMD-accelerated replacement for the stdlib module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# orjson encodes straight to bytes and is considerably faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shared session so repeated queries reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# Read size used when streaming the file; a multiple of 3 so every chunk
+# base64-encodes without padding
+READ_CHUNK_SIZE = 768 * 1024
+
+# File extension to MIME type sent to the enclave; anything else is text/plain
+FILE_TYPES = {
+    '.json': "application/json",
+    '.csv': "text/csv",
+    '.txt': "text/plain",
+    '.md': "text/markdown"
+}
+
+def build_request_body(question, file_path, file_type):
+    """Build the JSON request body, base64-encoding the file straight into it"""
+    # file_content is serialized last, so everything around its (empty)
+    # value is the fixed JSON envelope
+    envelope = {
+        "payload": {
+            "question": question,
+            "file_type": file_type,
+            "file_content": ""
+        }
+    }
+    if orjson is not None:
+        envelope = orjson.dumps(envelope)
+    else:
+        envelope = json.dumps(envelope).encode('utf-8')
+    head, tail = envelope.rsplit(b'""', 1)
+    head += b'"'
+    tail = b'"' + tail
+    
+    with open(file_path, 'rb') as f:
+        # Size the buffer from the open handle and encode exactly that many bytes
+        file_size = os.fstat(f.fileno()).st_size
+        content_end = len(head) + 4 * ((file_size + 2) // 3)
+        body = bytearray(content_end + len(tail))
+        with memoryview(body) as view:
+            view[:len(head)] = head
+            pos = len(head)
+            remaining = file_size
+            while remaining:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                encoded = base64.b64encode(chunk)
+                view[pos:pos + len(encoded)] = encoded
+                pos += len(encoded)
+            
+            if pos != content_end:
+                raise ValueError(f"File {file_path} changed while it was being read")
+            view[pos:] = tail
+    
+    return body
+
 def query_gemini_enclave(enclave_url, question, file_path):
-    # Read and encode file
+    # Validate file
     if not os.path.exists(file_path):
         print(f"Error: File {file_path} not found")
         sys.exit(1)
@@ -18,28 +96,15 @@ def query_gemini_enclave(enclave_url, question, file_path):
         print("Error: File size exceeds 10MB limit")
         sys.exit(1)
     
-    with open(file_path, 'rb') as f:
-        file_content = base64.b64encode(f.read()).decode('utf-8')
-    
     # Determine file type
-    file_type = "text/plain"
-    if file_path.endswith('.json'):
-        file_type = "application/json"
-    elif file_path.endswith('.csv'):
-        file_type = "text/csv"
-    elif file_path.endswith('.txt'):
-        file_type = "text/plain"
-    elif file_path.endswith('.md'):
-        file_type = "text/markdown"
+    file_type = FILE_TYPES.get(os.path.splitext(file_path)[1].lower(), "text/plain")
     
     # Prepare request
-    payload = {
-        "payload": {
-            "question": question,
-            "file_content": file_content,
-            "file_type": file_type
-        }
-    }
+    try:
+        body = build_request_body(question, file_path, file_type)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     
     print(f"Querying Gemini with file: {file_path} ({file_size} bytes)")
     print(f"Question: {question}")
@@ -47,9 +112,9 @@ def query_gemini_enclave(enclave_url, question, file_path):
     
     # Make request
     try:
-        response = requests.post(
+        response = _SESSION.post(
             f"{enclave_url}/process_gemini",
-            json=payload,
+            data=body,
             headers={"Content-Type": "application/json"},
             timeout=120  # 2 minute timeout for large files
         )
@@ -61,7 +126,7 @@ def query_gemini_enclave(enclave_url, question, file_path):
         sys.exit(1)
     
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content) if orjson is not None else response.json()
         print("\n=== Response ===")
         print(json.dumps(data, indent=2))
         
@@ -70,7 +135,7 @@ def query_gemini_enclave(enclave_url, question, file_path):
         timestamp = data['response']['data']['timestamp_ms']
         answer = data['response']['data']['data']['answer']
         model = data['response']['data']['data']['model']
-        file_hash = ''.join(format(x, '02x') for x in data['response']['data']['data']['file_hash'])
+        file_hash = bytes(data['response']['data']['data']['file_hash']).hex()
         
         print(f"\n=== Use these values for Sui transaction ===")
         print(f"export GEMINI_SIGNATURE={sig}")
@@ -5,28 +5,60 @@ This handles all the functionality of configure_enclave.sh but works on Windows
 """
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import json
 import time
 import os
+import re
 import yaml
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+# Existing secret lines in expose_enclave.sh, and the marker new ones follow
+SECRET_LINE_PATTERN = re.compile(r'^.*(?:SECRET_VALUE=|secrets\.json).*\n?', re.MULTILINE)
+SECRETS_BLOCK_PATTERN = re.compile(r'^.*# Secrets-block.*$', re.MULTILINE)
+
+# Ingress rules for the Nautilus security group: SSH, enclave server and HTTPS
+INGRESS_RULES = [
+    {
+        'IpProtocol': 'tcp',
+        'FromPort': port,
+        'ToPort': port,
+        'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
+    }
+    for port in (22, 3000, 443)
+]
+
+# Shared client config: a larger keep-alive connection pool and adaptive retries
+BOTO_CONFIG = Config(
+    max_pool_connections=16,
+    tcp_keepalive=True,
+    retries={'mode': 'adaptive', 'max_attempts': 5}
+)
+
 class ImprovedNautilusDeployer:
     def __init__(self, config):
         self.config = config
         self.region = config.get('region', 'us-east-1')
-        self.ec2_client = boto3.client('ec2', region_name=self.region)
-        self.secrets_client = boto3.client('secretsmanager', region_name=self.region)
-        self.iam_client = boto3.client('iam', region_name=self.region)
+        self.ec2_client = boto3.client('ec2', region_name=self.region, config=BOTO_CONFIG)
+        self.secrets_client = boto3.client('secretsmanager', region_name=self.region, config=BOTO_CONFIG)
+        self.iam_client = boto3.client('iam', region_name=self.region, config=BOTO_CONFIG)
         
     def load_endpoints(self):
         """Load endpoints from allowed_endpoints.yaml"""
         endpoints_file = Path("src/nautilus-server/allowed_endpoints.yaml")
         if endpoints_file.exists():
             with open(endpoints_file, 'r') as f:
-                data = yaml.safe_load(f)
+                data = yaml.load(f, Loader=YamlLoader)
                 endpoints = data.get('endpoints', [])
                 
                 # Replace region-specific AWS endpoints
@@ -93,9 +125,10 @@ class ImprovedNautilusDeployer:
             )
             print(f"✓ Created instance profile: {role_name}")
             
-            # Wait for instance profile to be ready
+            # Wait for instance profile to be ready; EC2 can lag behind IAM,
+            # so launch_instance also retries run_instances
             print("⏳ Waiting for IAM role to propagate...")
-            time.sleep(15)
+            self.wait_for_instance_profile(role_name, role_name)
             
             return role_name
             
@@ -107,19 +140,60 @@ class ImprovedNautilusDeployer:
                 print(f"❌ Error creating IAM role: {e}")
                 raise
     
-    def create_security_group(self):
-        """Create security group for Nautilus"""
+    def wait_for_instance_profile(self, profile_name, role_name, timeout=60):
+        """Poll until the instance profile exists with the role attached"""
+        delay = 0.5
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                response = self.iam_client.get_instance_profile(InstanceProfileName=profile_name)
+                roles = response['InstanceProfile']['Roles']
+                if any(role['RoleName'] == role_name for role in roles):
+                    return
+            except self.iam_client.exceptions.NoSuchEntityException:
+                pass
+            
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Instance profile {profile_name} not ready after {timeout}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 5)
+    
+    def run_instances_with_retry(self, launch_params, timeout=60):
+        """Run instances, retrying while EC2 doesn't yet see a new instance profile"""
+        delay = 1
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self.ec2_client.run_instances(**launch_params)
+            except ClientError as e:
+                error = e.response.get('Error', {})
+                profile_not_ready = (
+                    'IamInstanceProfile' in launch_params
+                    and error.get('Code') == 'InvalidParameterValue'
+                    and 'iam instance profile' in error.get('Message', '').lower()
+                )
+                if not profile_not_ready or time.monotonic() + delay > deadline:
+                    raise
+            
+            print("⏳ Instance profile not visible to EC2 yet, retrying launch...")
+            time.sleep(delay)
+            delay = min(delay * 2, 10)
+    
+    def create_security_group(self, log=print):
+        """Create security group for Nautilus, reporting progress through log"""
         sg_name = "instance-script-sg"
         
         try:
-            # Check if security group already exists
+            # Check if security group already exists (GroupNames only
+            # searches the default VPC, where the instance is launched)
             try:
                 response = self.ec2_client.describe_security_groups(GroupNames=[sg_name])
                 security_group_id = response['SecurityGroups'][0]['GroupId']
-                print(f"✓ Using existing security group: {security_group_id}")
+                log(f"✓ Using existing security group: {security_group_id}")
                 return security_group_id
-            except:
-                pass
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'InvalidGroup.NotFound':
+                    raise
             
             # Create new security group
             response = self.ec2_client.create_security_group(
@@ -132,33 +206,14 @@ class ImprovedNautilusDeployer:
             # Add rules
             self.ec2_client.authorize_security_group_ingress(
                 GroupId=security_group_id,
-                IpPermissions=[
-                    {
-                        'IpProtocol': 'tcp',
-                        'FromPort': 22,
-                        'ToPort': 22,
-                        'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
-                    },
-                    {
-                        'IpProtocol': 'tcp',
-                        'FromPort': 3000,
-                        'ToPort': 3000,
-                        'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
-                    },
-                    {
-                        'IpProtocol': 'tcp',
-                        'FromPort': 443,
-                        'ToPort': 443,
-                        'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
-                    }
-                ]
+                IpPermissions=INGRESS_RULES
             )
             
-            print(f"✓ Created security group: {security_group_id}")
+            log(f"✓ Created security group: {security_group_id}")
             return security_group_id
             
         except Exception as e:
-            print(f"❌ Error creating security group: {e}")
+            log(f"❌ Error creating security group: {e}")
             raise
     
     def create_secret(self):
@@ -199,22 +254,17 @@ class ImprovedNautilusDeployer:
             content = f.read()
         
         # Remove existing secret lines
-        lines = content.split('\n')
-        filtered_lines = []
-        for line in lines:
-            if 'SECRET_VALUE=' not in line and 'secrets.json' not in line:
-                filtered_lines.append(line)
+        content = SECRET_LINE_PATTERN.sub('', content)
         
         # Find the secrets block and add new lines
-        new_lines = []
-        for line in filtered_lines:
-            new_lines.append(line)
-            if '# Secrets-block' in line:
-                new_lines.append(f'SECRET_VALUE=$(aws secretsmanager get-secret-value --secret-id {secret_arn} --region {self.region} | jq -r .SecretString)')
-                new_lines.append('echo "$SECRET_VALUE" | jq -R \'{"API_KEY": .}\' > secrets.json')
+        secret_lines = '\n'.join([
+            f'SECRET_VALUE=$(aws secretsmanager get-secret-value --secret-id {secret_arn} --region {self.region} | jq -r .SecretString)',
+            'echo "$SECRET_VALUE" | jq -R \'{"API_KEY": .}\' > secrets.json'
+        ])
+        content = SECRETS_BLOCK_PATTERN.sub(lambda m: f"{m.group(0)}\n{secret_lines}", content)
         
         with open(script_path, 'w') as f:
-            f.write('\n'.join(new_lines))
+            f.write(content)
         
         print("✓ Updated expose_enclave.sh with secret fetching logic")
     
@@ -317,7 +367,7 @@ class ImprovedNautilusDeployer:
             launch_params['IamInstanceProfile'] = {'Name': iam_role}
         
         print(f"🚀 Launching EC2 instance: {instance_name}")
-        response = self.ec2_client.run_instances(**launch_params)
+        response = self.run_instances_with_retry(launch_params)
         
         instance_id = response['Instances'][0]['InstanceId']
         print(f"✓ Launched instance: {instance_id}")
@@ -338,11 +388,11 @@ class ImprovedNautilusDeployer:
             except Exception as e:
                 print(f"⚠️  Warning: Could not associate IAM profile: {e}")
         
-        time.sleep(10)
-        
         # Get public IP
         response = self.ec2_client.describe_instances(InstanceIds=[instance_id])
-        public_ip = response['Reservations'][0]['Instances'][0]['PublicIpAddress']
+        public_ip = response['Reservations'][0]['Instances'][0].get('PublicIpAddress')
+        if not public_ip:
+            raise RuntimeError(f"Instance {instance_id} has no public IP address")
         
         print(f"✓ Instance ready: {public_ip}")
         return instance_id, public_ip, instance_name
@@ -358,22 +408,41 @@ class ImprovedNautilusDeployer:
             endpoints = self.load_endpoints()
             print(f"🌐 Loaded {len(endpoints)} endpoints: {endpoints}")
             
-            # Create secret if needed
-            secret_arn = None
-            iam_role = None
-            
-            if self.config.get('use_secret', False):
-                secret_arn = self.create_secret()
+            # The security group doesn't depend on the secret/IAM setup, so
+            # create it in the background meanwhile (boto3 clients are thread-safe).
+            # Its messages are buffered and printed once it finishes so they
+            # don't interleave with the secret/IAM output.
+            security_group_log = []
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # Create security group
+                security_group_future = executor.submit(
+                    self.create_security_group, security_group_log.append
+                )
                 
-                # Create IAM role for secret access
-                role_name = f"role-{self.config['instance_name']}-{int(time.time())}"
-                iam_role = self.create_iam_role(role_name, secret_arn)
+                # Create secret if needed
+                secret_arn = None
+                iam_role = None
                 
-                # Update expose_enclave.sh
-                self.update_expose_enclave_script(secret_arn, iam_role)
-            
-            # Create security group
-            security_group_id = self.create_security_group()
+                try:
+                    if self.config.get('use_secret', False):
+                        secret_arn = self.create_secret()
+                        
+                        # Create IAM role for secret access
+                        role_name = f"role-{self.config['instance_name']}-{int(time.time())}"
+                        iam_role = self.create_iam_role(role_name, secret_arn)
+                        
+                        # Update expose_enclave.sh
+                        self.update_expose_enclave_script(secret_arn, iam_role)
+                finally:
+                    # Report the security group outcome even if the secret/IAM
+                    # setup failed, so neither error is lost
+                    security_group_error = security_group_future.exception()
+                    for message in security_group_log:
+                        print(message)
+                    if security_group_error is not None and not security_group_log:
+                        print(f"❌ Error creating security group: {security_group_error}")
+                
+                security_group_id = security_group_future.result()
             
             # Launch instance
             instance_id, public_ip, instance_name = self.launch_instance(
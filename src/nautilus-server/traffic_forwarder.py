@@ -3,73 +3,98 @@
 
 """
 A bidirectional network traffic forwarder that bridges TCP/IP and VSOCK sockets, enabling communication
-between host machines and enclaves.
+between host machines and enclaves. All connections are served from a single asyncio event loop.
 Referenced from https://github.com/aws-samples/aws-nitro-enclaves-workshop/blob/main/resources/code/my-first-enclave/secure-local-channel/traffic_forwarder.py
 """
 
+import asyncio
 import socket
 import sys
-import threading
-import time
 
+# Bytes moved per read/write when pumping data between sockets
+BUFFER_SIZE = 64 * 1024
+# Kernel send/receive buffer size requested for both sockets
+SOCKET_BUFFER_SIZE = 1 << 20
+
+
+def tune_socket(sock):
+    """Enlarge kernel buffers and, on TCP sockets, disable Nagle's algorithm."""
+    for option in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, option, SOCKET_BUFFER_SIZE)
+        except OSError:
+            pass  # Not every socket family honours these options
+    if sock.family == socket.AF_INET:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+async def server(local_ip, local_port, remote_cid, remote_port):
+    def on_connect(client_reader, client_writer):
+        return handle_connection(client_reader, client_writer, remote_cid,
+                                 remote_port)
 
-def server(local_ip, local_port, remote_cid, remote_port):
     while True:
         try:
-            dock_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            dock_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            dock_socket.bind((local_ip, local_port))
-            dock_socket.listen(5)
+            dock_server = await asyncio.start_server(on_connect,
+                                                     local_ip,
+                                                     local_port,
+                                                     reuse_address=True,
+                                                     limit=BUFFER_SIZE)
             print(f"[INFO] Traffic forwarder listening on {local_ip}:{local_port}")
 
-            while True:
-                try:
-                    client_socket, addr = dock_socket.accept()
-                    print(f"[INFO] Accepted connection from {addr}")
-
-                    server_socket = socket.socket(socket.AF_VSOCK, socket.SOCK_STREAM)
-                    server_socket.connect((remote_cid, remote_port))
-
-                    outgoing_thread = threading.Thread(target=forward,
-                                                       args=(client_socket,
-                                                             server_socket))
-                    incoming_thread = threading.Thread(target=forward,
-                                                       args=(server_socket,
-                                                             client_socket))
-
-                    outgoing_thread.start()
-                    incoming_thread.start()
-                except Exception as e:
-                    print(f"[ERROR] Error handling connection: {e}")
-                    time.sleep(1)
+            async with dock_server:
+                await dock_server.serve_forever()
         except Exception as e:
             print(f"[ERROR] Server error: {e}")
-            time.sleep(5)  # Wait before retry
-            try:
-                dock_socket.close()
-            except:
-                pass
+            await asyncio.sleep(5)  # Wait before retry
+
+
+async def handle_connection(client_reader, client_writer, remote_cid,
+                            remote_port):
+    addr = client_writer.get_extra_info('peername')
+    print(f"[INFO] Accepted connection from {addr}")
 
+    server_socket = socket.socket(socket.AF_VSOCK, socket.SOCK_STREAM)
+    try:
+        server_socket.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(server_socket,
+                                                      (remote_cid, remote_port))
 
-def forward(source, destination):
-    string = ' '
-    while string:
+        tune_socket(client_writer.get_extra_info('socket'))
+        tune_socket(server_socket)
+
+        server_reader, server_writer = await asyncio.open_connection(
+            sock=server_socket, limit=BUFFER_SIZE)
+    except Exception as e:
+        print(f"[ERROR] Error handling connection: {e}")
+        server_socket.close()
+        client_writer.close()
+        return
+
+    await asyncio.gather(forward(client_reader, server_writer),
+                         forward(server_reader, client_writer))
+    server_writer.close()
+    client_writer.close()
+
+
+async def forward(source, destination):
+    while True:
         try:
-            string = source.recv(1024)
-            if string:
-                destination.sendall(string)
+            data = await source.read(BUFFER_SIZE)
+            if data:
+                destination.write(data)
+                await destination.drain()
             else:
-                source.shutdown(socket.SHUT_RD)
-                destination.shutdown(socket.SHUT_WR)
+                if destination.can_write_eof():
+                    destination.write_eof()
+                break
         except ConnectionResetError as e:
             print(f"[WARN] Connection reset by peer: {e}")
-            source.close()
             destination.close()
             break
         except Exception as e:
             # Catch-all for any other unexpected exceptions
             print(f"[ERROR] Unexpected socket exception: {e}")
-            source.close()
             destination.close()
             break
 
@@ -80,15 +105,13 @@ def main(args):
     remote_cid = int(args[2])
     remote_port = int(args[3])
 
-    thread = threading.Thread(target=server,
-                              args=(local_ip, local_port, remote_cid,
-                                    remote_port))
-    thread.start()
     print(
         f"starting forwarder on {local_ip}:{local_port} {remote_cid}:{remote_port}"
     )
-    while True:
-        time.sleep(60)
+    # The default event loop is used on purpose: uvloop resolves sock_connect
+    # addresses with getaddrinfo and wraps sockets in libuv TCP handles that
+    # force TCP_NODELAY, neither of which works for AF_VSOCK sockets
+    asyncio.run(server(local_ip, local_port, remote_cid, remote_port))
 
 
 if __name__ == '__main__':